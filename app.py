@@ -1,16 +1,141 @@
 # Import necessary libraries
 from flask import Flask, request, jsonify, Response
-import time
+from flask.json.provider import JSONProvider, _default
+import atexit
+import functools
+import orjson
 import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+    Installing it on the app routes every JSON encode and decode (jsonify,
+    request.get_json, ...) through orjson's native implementation instead of
+    the stdlib json module.
+    Non-string dict keys are allowed, and types orjson does not handle
+    natively (Decimal, ...) fall back to Flask's default conversion, so
+    anything the stock provider accepts still serializes. Dates are passed
+    through to that fallback too, keeping Flask's HTTP date format.
+    """
+
+    def _dumps_bytes(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys'):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get('default', _default), option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj), mimetype='application/json')
 
 # Initialize the Flask application
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+
+# Configure logging to see requests in the console.
+# Handlers only put records on a queue; a background listener formats them and
+# writes them to stderr, so requests never contend for the stream lock.
+_log_queue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+# Timestamps are printed as raw epoch seconds, which avoids the strftime and
+# localtime calls that %(asctime)s costs for every record.
+_log_stream_handler.setFormatter(logging.Formatter('%(created).3f - %(levelname)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_stream_handler, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logging.getLogger().setLevel(logging.INFO)
+logging.getLogger().addHandler(QueueHandler(_log_queue))
+
+log = logging.getLogger(__name__)
+
+# Set when the server starts shutting down (see post_worker_init in
+# gunicorn.conf.py) to wake every request parked in /no-response.
+# gunicorn's gevent worker monkey-patches threading before importing the app,
+# so there this is a cooperative gevent Event; under the threaded development
+# server it stays a regular thread-safe Event.
+shutdown_event = threading.Event()
+
+# POST bodies larger than this (or of unknown length) are never read just
+# for the sake of logging them
+_MAX_LOGGED_BODY = 64 * 1024
+
+def log_and_parse(fn=None, *, read_body=True):
+    """
+    Log the incoming request before calling the wrapped endpoint.
+    For POST requests any JSON or form data is logged as well, as long as the
+    body is smaller than _MAX_LOGGED_BODY. Pass read_body=False for endpoints
+    that must leave the body untouched. All of this is skipped when INFO
+    logging is disabled, so the body is not parsed at all.
+    """
+    if fn is None:
+        return functools.partial(log_and_parse, read_body=read_body)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if log.isEnabledFor(logging.INFO):
+            log.info("Received %s request to %s", request.method, request.path)
+            if read_body and request.method == 'POST':
+                content_length = request.content_length or 0
+                if 0 < content_length < _MAX_LOGGED_BODY:
+                    body = request.get_json(silent=True, cache=True)
+                    if body is not None:
+                        log.info("POST JSON data: %s", body)
+                    else:
+                        log.info("POST form data: %s", request.form)
+        return fn(*args, **kwargs)
+    return wrapper
+
+# Response bodies that never depend on the request are built once at import
+# time instead of being rebuilt and re-serialized by every request.
 
-# Configure logging to see requests in the console
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Looks like incomplete or invalid JSON (missing a closing brace / extra comma)
+_MALFORMED_BODY = b'{"status": "error", "message": "This is malformed JSON, missing a closing brace or invalid syntax", "data": [1, 2,'
+# Plain text that will be served with a JSON content type
+_NON_JSON_BODY = b"This is not JSON, but the header says it is!"
+_HTML_BODY = b"<html><body><h1>Hello from Test API!</h1><p>This is an HTML response.</p></body></html>"
+_EMPTY_JSON = b"{}"
+_SIMPLE_JSON = orjson.dumps({"status": "ok", "message": "This is a simple response."})
+_LLM_JSON = orjson.dumps({
+    "choices": [
+        {
+            "message": {
+                "role": "string",
+                "content": "string<>"
+            },
+            "finish_reason": "string",
+            "index": "string"
+        }
+    ]
+})
+
+# Responses whose status, headers and body are all fixed are cached whole.
+# Nothing in the app mutates a response after the handler returns it (no
+# sessions, no after_request hooks), so the same instance can be handed out
+# for every request. The bytes bodies are handed to the server as they are,
+# so no body is copied or re-encoded per request.
+_R204 = Response(status=204, direct_passthrough=True)
+_R200_EMPTY = Response(b"", status=200, direct_passthrough=True)
+_R503 = Response(status=503)
+_MALFORMED_RESPONSE = Response(_MALFORMED_BODY, status=200, mimetype='application/json', direct_passthrough=True)
+_EMPTY_JSON_RESPONSE = Response(_EMPTY_JSON, status=200, mimetype='application/json', direct_passthrough=True)
+_HTML_RESPONSE = Response(_HTML_BODY, mimetype='text/html', direct_passthrough=True)
+_NON_JSON_RESPONSE = Response(_NON_JSON_BODY, status=200, mimetype='application/json', direct_passthrough=True)
+_SIMPLE_JSON_RESPONSE = Response(_SIMPLE_JSON, status=200, mimetype='application/json', direct_passthrough=True)
+_LLM_JSON_RESPONSE = Response(_LLM_JSON, status=200, mimetype='application/json', direct_passthrough=True)
 
 # Define the endpoint that will "not return anything" (i.e., cause a timeout)
 @app.route('/no-response', methods=['GET', 'POST'])
+@log_and_parse(read_body=False)
 def no_response_endpoint():
     """
     This endpoint is designed to simulate a server that does not respond.
@@ -21,30 +146,30 @@ def no_response_endpoint():
     From the client's perspective, this API will appear to "not return anything"
     because no HTTP response (status code, headers, or body) will be sent
     before the client's connection times out.
+    The request body is deliberately never read before sleeping.
     """
-    logging.info(f"Received {request.method} request to /no-response")
-    if request.method == 'POST':
-        # Log any incoming JSON or form data for POST requests
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-
     # Intentionally sleep for a very long time.
     # This will cause the client's connection to time out.
     # A typical client timeout might be 30 seconds, 60 seconds, etc.
     # 600 seconds (10 minutes) ensures it exceeds most defaults.
-    time.sleep(600)
+    # Under gunicorn's gevent workers this wait yields to the event loop, so a
+    # parked request costs a greenlet rather than a whole thread and the other
+    # endpoints stay responsive.
+    # The wait ends early if the server shuts down, so a deploy does not have
+    # to kill parked requests; they are answered with 503 instead.
+    if shutdown_event.wait(timeout=600):
+        return _R503
 
     # IMPORTANT: The code below this line will generally NOT be reached
     # because the client will have timed out and closed the connection
-    # before the sleep finishes. If it somehow is reached (e.g., a very
+    # before the wait finishes. If it somehow is reached (e.g., a very
     # long client timeout or direct server interaction), it would send
     # a 200 OK, but that's not the primary intent.
-    logging.warning("This line should ideally not be reached if client times out.")
+    log.warning("This line should ideally not be reached if client times out.")
     return jsonify({"message": "This response should not be seen by the client due to timeout."}), 200
 
 @app.route('/malformed-response', methods=['GET', 'POST'])
+@log_and_parse
 def malformed_response_endpoint():
     """
     This endpoint is designed to simulate an API that returns a response
@@ -52,25 +177,15 @@ def malformed_response_endpoint():
     This can cause client-side parsers to throw errors, leading to a "crash"
     or unhandled exception in the webhook application if not properly handled.
     """
-    logging.info(f"Received {request.method} request to /malformed-response")
-    if request.method == 'POST':
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-
-    # Return a string that looks like incomplete or invalid JSON
-    # For example, missing a closing brace or having extra commas
-    malformed_json_string = '{"status": "error", "message": "This is malformed JSON, missing a closing brace or invalid syntax", "data": [1, 2,'
-    
     # You could also return plain text when JSON is expected
     # return "This is plain text, not JSON!", 200, {'Content-Type': 'text/plain'}
 
     # Return the malformed string with a 200 OK status, but with JSON content type
     # This will force the client to try to parse it as JSON and fail.
-    return malformed_json_string, 200, {'Content-Type': 'application/json'}
+    return _MALFORMED_RESPONSE
 
 @app.route('/empty-json-response', methods=['GET', 'POST'])
+@log_and_parse
 def empty_json_response_endpoint():
     """
     This endpoint is designed to simulate an API that returns a successful
@@ -78,17 +193,11 @@ def empty_json_response_endpoint():
     This can trigger "empty response" or "no output" errors in client
     applications that expect a specific, non-empty data structure.
     """
-    logging.info(f"Received {request.method} request to /empty-json-response")
-    if request.method == 'POST':
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-
     # Return an empty JSON object with a 200 OK status
-    return jsonify({}), 200
+    return _EMPTY_JSON_RESPONSE
 
 @app.route('/non-json-with-json-header', methods=['GET', 'POST'])
+@log_and_parse
 def non_json_with_json_header_endpoint():
     """
     This endpoint returns a plain text string but with a 'Content-Type: application/json' header.
@@ -96,17 +205,11 @@ def non_json_with_json_header_endpoint():
     attempt to parse the plain text as JSON and fail. This can lead to a "crash"
     or unhandled exception if the client's error handling for JSON parsing is not robust.
     """
-    logging.info(f"Received {request.method} request to /non-json-with-json-header")
-    if request.method == 'POST':
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-    
     # Return plain text, but with a JSON content type header
-    return "This is not JSON, but the header says it is!", 200, {'Content-Type': 'application/json'}
+    return _NON_JSON_RESPONSE
 
 @app.route('/empty-structured-json', methods=['GET', 'POST'])
+@log_and_parse
 def empty_structured_json_endpoint():
     """
     This endpoint returns a valid JSON object, but with empty or null values
@@ -120,13 +223,6 @@ def empty_structured_json_endpoint():
     4.  Omit 'output' key entirely - comment out the 'output' dictionary
     5.  'output': None (null output object) - uncomment the line below
     """
-    logging.info(f"Received {request.method} request to /empty-structured-json")
-    if request.method == 'POST':
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-    
     # --- Modify this 'response_data' dictionary to test different "empty" scenarios ---
     response_data = {
         "output": {
@@ -146,6 +242,7 @@ def empty_structured_json_endpoint():
     return jsonify(response_data), 200
 
 @app.route('/no-content-204', methods=['GET', 'POST'])
+@log_and_parse
 def no_content_204_endpoint():
     """
     This endpoint returns an HTTP 204 No Content status.
@@ -153,17 +250,11 @@ def no_content_204_endpoint():
     response body. If the webhook app expects *any* content, even an empty JSON object,
     this might trigger an "empty response" error at a lower level than JSON parsing.
     """
-    logging.info(f"Received {request.method} request to /no-content-204")
-    if request.method == 'POST':
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-    
     # Return 204 No Content status. No body should be sent with 204.
-    return Response(status=204)
+    return _R204
 
 @app.route('/html-like-response', methods=['GET', 'POST'])
+@log_and_parse
 def html_like_response_endpoint():
     """
     This endpoint returns a simple HTML-like string with a 'Content-Type: text/html' header.
@@ -171,18 +262,11 @@ def html_like_response_endpoint():
     parsing errors or an interpretation of the model output as "empty" because
     it cannot extract the expected data from the HTML structure.
     """
-    logging.info(f"Received {request.method} request to /html-like-response")
-    if request.method == 'POST':
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-    
     # Return a simple HTML string
-    html_content = "<html><body><h1>Hello from Test API!</h1><p>This is an HTML response.</p></body></html>"
-    return Response(html_content, mimetype='text/html')
+    return _HTML_RESPONSE
 
 @app.route('/empty-body-200', methods=['GET', 'POST'])
+@log_and_parse
 def empty_body_200_endpoint():
     """
     This endpoint returns an HTTP 200 OK status with a completely empty response body.
@@ -190,18 +274,12 @@ def empty_body_200_endpoint():
     but isn't. Some client-side parsers or webhook systems might interpret this
     as an "empty" response if they expect any content at all.
     """
-    logging.info(f"Received {request.method} request to /empty-body-200")
-    if request.method == 'POST':
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-    
     # Return an empty string with 200 OK status and no specific content-type
     # This often defaults to 'text/plain' or no content-type, which can be problematic
-    return "", 200
+    return _R200_EMPTY
 
 @app.route('/simple-unexpected-json', methods=['GET', 'POST'])
+@log_and_parse
 def simple_unexpected_json_endpoint():
     """
     This endpoint returns a valid JSON object, but it's a very simple, flat structure.
@@ -209,17 +287,11 @@ def simple_unexpected_json_endpoint():
     this simple JSON might be interpreted as "empty" or "not normal" because
     it lacks the expected keys or nesting.
     """
-    logging.info(f"Received {request.method} request to /simple-unexpected-json")
-    if request.method == 'POST':
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-    
     # Return a simple, flat JSON object
-    return jsonify({"status": "ok", "message": "This is a simple response."}), 200
+    return _SIMPLE_JSON_RESPONSE
 
 @app.route('/specific-llm-like-response', methods=['GET', 'POST'])
+@log_and_parse
 def specific_llm_like_response_endpoint():
     """
     This endpoint returns a JSON structure that mimics a common LLM API response,
@@ -227,26 +299,7 @@ def specific_llm_like_response_endpoint():
     This is designed to test if FastGPT's model flow validation specifically
     checks for actual generated content rather than just the presence of keys.
     """
-    logging.info(f"Received {request.method} request to /specific-llm-like-response")
-    if request.method == 'POST':
-        if request.is_json:
-            logging.info(f"POST JSON data: {request.json}")
-        else:
-            logging.info(f"POST form data: {request.form}")
-    
-    response_data = {
-        "choices": [
-            {
-                "message": {
-                    "role": "string",
-                    "content": "string<>"
-                },
-                "finish_reason": "string",
-                "index": "string"
-            }
-        ]
-    }
-    return jsonify(response_data), 200
+    return _LLM_JSON_RESPONSE
 
 
 # Run the Flask application
@@ -255,4 +308,11 @@ if __name__ == '__main__':
     # For local testing, '0.0.0.0' makes it accessible from your network,
     # and 5000 is the default Flask port.
     # If deploying, ensure it's accessible from your third-party app.
-    app.run(host='0.0.0.0', port=5000, debug=False) # Set debug=False for production use
+    # app.run starts the single-process Werkzeug development server, so it is
+    # only used when FLASK_DEV is set. Otherwise serve the app with gunicorn:
+    #     gunicorn -c gunicorn.conf.py app:app
+    if os.environ.get('FLASK_DEV'):
+        app.run(host='0.0.0.0', port=5000, debug=False) # Set debug=False for production use
+    else:
+        raise SystemExit("Run with 'gunicorn -c gunicorn.conf.py app:app', "
+                         "or set FLASK_DEV=1 to use the development server.")
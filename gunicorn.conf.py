@@ -0,0 +1,46 @@
+# Gunicorn configuration for serving the test API.
+# Launch with: gunicorn -c gunicorn.conf.py app:app
+import os
+import signal
+
+# Listen on all interfaces on the default Flask port
+bind = '0.0.0.0:5000'
+
+# The usual gunicorn sizing of two workers per core plus one
+workers = (os.cpu_count() or 1) * 2 + 1
+
+# gevent workers run every request as a greenlet on an event loop, and
+# sleeping yields to that loop. A request parked in
+# /no-response therefore no longer occupies an OS thread, and the other
+# endpoints keep answering while any number of clients wait for a timeout.
+# (A gthread worker would still pin one thread per parked request.)
+worker_class = 'gevent'
+# Upper bound on simultaneous connections per worker, parked ones included.
+# Each greenlet only needs a few KB, so in practice the open file descriptor
+# limit (ulimit -n) is what caps this.
+worker_connections = 10000
+
+# Keep idle client connections open so repeated requests skip the handshake.
+# 75 s outlasts the idle timeout of most client connection pools.
+keepalive = 75
+
+# No per-request access log line; the app already logs each request through
+# its queued logger when INFO is enabled.
+accesslog = None
+
+
+def post_worker_init(worker):
+    """
+    Make SIGTERM also set app.shutdown_event, so requests parked in
+    /no-response return right away. Otherwise the worker would have to wait
+    out graceful_timeout and then kill them.
+    """
+    import app
+
+    handle_exit = worker.handle_exit
+
+    def handle_exit_and_wake(sig, frame):
+        app.shutdown_event.set()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_exit_and_wake)